@@ -1,38 +1,259 @@
-import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+import diskcache
+import json_repair
+import orjson
+import pandas as pd
+import asyncio
+import hashlib
+import logging
 import os
-from typing import List, Dict, Any
+import random
+from typing import List, Dict, Any, Callable, Optional
 import streamlit as st
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
 from .summary_agent import SummaryAgent
 from .fact_check import FactCheckAgent
+from .content_store import store_content
+from .gemini_client import get_gemini_model
+
+logger = logging.getLogger(__name__)
+
+# Number of articles packed into a single classification request
+BATCH_SIZE = 8
+
+# Bump whenever the classification prompts change so cached results are invalidated
+PROMPT_VERSION = 4
+
+# Shared by the single and batch classification prompts
+CLASSIFICATION_GUIDELINES = """Guidelines:
+- Classify based on the main topic/theme of the SUMMARY only
+- Consider the fact-check results when assessing credibility
+- Provide confidence level based on clarity and verifiability of claims
+- Identify key themes that appear in the summary
+- Assess overall sentiment and tone from the summary
+- Keep analysis notes to a brief assessment of content quality and reliability
+- Provide a credibility score between 0.0 (low) and 1.0 (high)
+"""
+
+FACT_CHECK_HEADER = "Fact-check Results:\n"
+
+# Prompt token budgets, estimated with the usual ~4 characters per token heuristic
+CHARS_PER_TOKEN = 4
+MAX_SUMMARY_TOKENS = 512
+MAX_CLAIM_TOKENS = 64
+
+# Local zero-shot model used to skip Gemini for clear-cut articles when transformers is installed
+DEFAULT_LOCAL_CLASSIFIER_MODEL = "valhalla/distilbart-mnli-12-3"
+
+# Gemini errors worth the full retry budget, and errors that no retry can fix
+TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded
+)
+NON_RETRYABLE_ERRORS = (
+    google_exceptions.InvalidArgument,
+    google_exceptions.PermissionDenied,
+    google_exceptions.Unauthenticated,
+    google_exceptions.NotFound
+)
+
+# Cached classifications are kept for a week
+CACHE_EXPIRE_SECONDS = 86400 * 7
+
+
+# Single worker keeps background result writes in submission order
+_write_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def _write_json(filepath: str, data: Any):
+    """
+    Serialize data to a JSON file, logging failures since this runs off the Streamlit thread
+    
+    Args:
+        filepath (str): Destination file path
+        data (Any): JSON-serializable data
+    """
+    try:
+        Path(filepath).write_bytes(orjson.dumps(data))
+    except Exception:
+        logger.exception("Failed to save analysis to %s", filepath)
+
+
+@st.cache_resource(show_spinner="Loading local classification model...")
+def _get_local_classifier(model_name: str):
+    """
+    Load the zero-shot classification pipeline once per process
+    
+    Args:
+        model_name (str): Hugging Face model to load, or an empty string to disable local classification
+        
+    Returns:
+        Zero-shot classification pipeline, or None if disabled, transformers is not installed
+        or the model could not be loaded
+    """
+    if not model_name:
+        return None
+    try:
+        from transformers import pipeline
+    except ImportError:
+        return None
+    
+    # Load failures (download errors, missing torch, unknown model) return None so the
+    # failure is cached too and every run falls through to Gemini instead of retrying
+    try:
+        return pipeline("zero-shot-classification", model=model_name, device=-1)
+    except Exception:
+        logger.warning("Local classifier %s could not be loaded, using Gemini only", model_name, exc_info=True)
+        return None
+
+
+class RateLimiter:
+    """Token-bucket limiter for Gemini requests-per-minute and tokens-per-minute quotas"""
+    
+    # Throttled rates never drop below this fraction of the configured quota
+    MIN_RATE_FRACTION = 0.1
+    # Seconds for throttled rates to climb back to the configured quota
+    RECOVERY_SECONDS = 60
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.base_rpm = rpm
+        self.base_tpm = tpm
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.req_tokens = float(rpm)
+        self.tok_tokens = float(tpm)
+        self.last_refill = time.monotonic()
+        self.last_shrink = float('-inf')
+    
+    def _refill(self):
+        """Top up both buckets and ease throttled rates back toward the configured quota"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        self.rpm = min(self.base_rpm, self.rpm + elapsed * self.base_rpm / self.RECOVERY_SECONDS)
+        self.tpm = min(self.base_tpm, self.tpm + elapsed * self.base_tpm / self.RECOVERY_SECONDS)
+        self.req_tokens = min(self.rpm, self.req_tokens + elapsed * self.rpm / 60)
+        self.tok_tokens = min(self.tpm, self.tok_tokens + elapsed * self.tpm / 60)
+    
+    async def acquire(self, est_tokens: int = 0):
+        """
+        Wait until budget is available for one request of roughly est_tokens tokens
+        
+        Args:
+            est_tokens (int): Estimated number of prompt tokens for the request
+        """
+        while True:
+            self._refill()
+            needed_tokens = min(est_tokens, self.tpm)
+            if self.req_tokens >= 1 and self.tok_tokens >= needed_tokens:
+                self.req_tokens -= 1
+                self.tok_tokens -= needed_tokens
+                return
+            
+            # Sleep only as long as the emptier bucket needs to recover
+            wait = max(
+                (1 - self.req_tokens) * 60 / self.rpm,
+                (needed_tokens - self.tok_tokens) * 60 / self.tpm
+            )
+            await asyncio.sleep(wait)
+    
+    def shrink(self, factor: float = 0.5):
+        """
+        Reduce the bucket rates after the API reports that the quota was exhausted
+        
+        Concurrent requests tend to hit the same 429 together, so only one shrink
+        is applied per refill interval (at least a second).
+        
+        Args:
+            factor (float): Multiplier applied to the current rates
+        """
+        now = time.monotonic()
+        if now - self.last_shrink < max(1.0, 60 / self.rpm):
+            return
+        self.last_shrink = now
+        self.rpm = max(self.base_rpm * self.MIN_RATE_FRACTION, self.rpm * factor)
+        self.tpm = max(self.base_tpm * self.MIN_RATE_FRACTION, self.tpm * factor)
+        self.req_tokens = min(self.req_tokens, self.rpm)
+        self.tok_tokens = min(self.tok_tokens, self.tpm)
 
 
 class AnalysisAgent:
     """Main agent responsible for orchestrating analysis, classification, and fact-checking workflow"""
     
     def __init__(self):
+        # Predefined categories for classification
+        self.categories = (
+            "Health", "Environmental", "Social economics", "Conspiracy theory",
+            "Corporate control", "Ethical/religious issues", "Seed ownership",
+            "Scientific authority", "Other"
+        )
+        self._categories_set = frozenset(self.categories)
+        
+        # Constrain Gemini's decoder to the analysis schema instead of asking for JSON in the prompt
+        self.analysis_schema = {
+            "type": "object",
+            "properties": {
+                "classification": {"type": "string", "enum": list(self.categories)},
+                "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+                "key_themes": {"type": "array", "items": {"type": "string"}},
+                "analysis_notes": {"type": "string"},
+                "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral", "mixed"]},
+                "credibility_score": {"type": "number"}
+            },
+            "required": [
+                "classification", "confidence", "key_themes",
+                "analysis_notes", "sentiment", "credibility_score"
+            ]
+        }
+        self.batch_generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": {"type": "array", "items": self.analysis_schema}
+        }
+        
         self.api_key = os.getenv('GOOGLE_API_KEY')
         if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+            # Shared synchronous model, called from worker threads during classification so
+            # its gRPC channel is reused across runs instead of being bound to one event loop.
+            # Classification is a low-difficulty background task, so default to the cheapest Flash tier
+            self.model = get_gemini_model(
+                self.api_key,
+                os.getenv('GEMINI_MODEL', 'gemini-2.0-flash-lite'),
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "response_schema": self.analysis_schema
+                }
+            )
         else:
             self.model = None
         
+        # Defaults match Gemini Flash tier-1 quotas
+        self.rate_limiter = RateLimiter(
+            rpm=int(os.getenv('GEMINI_RPM', '2000')),
+            tpm=int(os.getenv('GEMINI_TPM', '4000000'))
+        )
+        
         # Initialize sub-agents
         self.summary_agent = SummaryAgent()
         self.fact_check_agent = FactCheckAgent()
         
-        # Predefined categories for classification
-        self.categories = [
-            "Health", "Environmental", "Social economics", "Conspiracy theory",
-            "Corporate control", "Ethical/religious issues", "Seed ownership",
-            "Scientific authority", "Other"
-        ]
-        
         # Create temp folder at project root if it doesn't exist
         self.temp_dir = os.path.join(os.getcwd(), 'temp')
         os.makedirs(self.temp_dir, exist_ok=True)
+        
+        # Persist classifications so repeat runs over the same articles skip Gemini
+        self.classification_cache = diskcache.Cache(os.path.join(self.temp_dir, 'classification_cache'))
+        
+        self._categories_csv = ', '.join(self.categories)
+        
+        # Static instructions go first and stay byte-identical across requests so
+        # Gemini's implicit prefix caching can skip them; article data is appended
+        self._prompt_prefix = self._create_prompt_prefix()
+        self._batch_prompt_prefix = self._create_prompt_prefix(batch=True)
     
     def analyze_articles(self, articles: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
@@ -76,10 +297,10 @@ class AnalysisAgent:
             json_filename = f"final_analysis_{timestamp}.json"
             json_filepath = os.path.join(self.temp_dir, json_filename)
             
-            with open(json_filepath, 'w', encoding='utf-8') as f:
-                json.dump(final_analyzed_articles, f, ensure_ascii=False, indent=2)
+            # Write in the background so the workflow can finish without waiting on disk
+            _write_executor.submit(_write_json, json_filepath, final_analyzed_articles)
             
-            st.info(f"🔖 Final analysis saved to: `{json_filepath}`")
+            st.info(f"🔖 Final analysis saving to: `{json_filepath}`")
         
         st.success("✅ Complete analysis workflow finished!")
         return final_analyzed_articles
@@ -97,116 +318,453 @@ class AnalysisAgent:
         analyzed_articles = []
         total_articles = len(articles)
         
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        progress_bar = st.progress(0, text=f"0/{total_articles}")
+        completed = 0
         
-        for i, article in enumerate(articles):
-            status_text.text(f"Classifying {i+1}/{total_articles}: {article['url']}")
-            
-            try:
-                classification_result = self._classify_single_article(article)
-                analyzed_articles.append(classification_result)
-                st.success(f"✅ Successfully classified: {article['url']}")
-                
-            except Exception as e:
-                st.error(f"❌ Error classifying {article['url']}: {str(e)}")
+        # Every widget update is a websocket round-trip, so only refresh ~20 times per run
+        update_every = max(1, total_articles // 20)
+        
+        def on_article_done(article: Dict[str, Any]):
+            nonlocal completed
+            completed += 1
+            if completed % update_every == 0 or completed == total_articles:
+                # Bar and label travel in a single widget update
+                progress_bar.progress(completed / total_articles, text=f"{completed}/{total_articles}")
+        
+        # Classification calls are independent, so run them concurrently
+        results = asyncio.run(self._classify_articles_async(articles, on_article_done))
+        
+        for article, result in zip(articles, results):
+            if isinstance(result, Exception):
+                st.error(f"❌ Error classifying {article['url']}: {str(result)}")
                 # Add fallback result
                 analyzed_articles.append(self._create_fallback_result(article))
-            
-            # Update progress
-            progress = (i + 1) / total_articles
-            progress_bar.progress(progress)
-            
-            # Small delay to avoid rate limiting
-            if i < total_articles - 1:
-                time.sleep(0.5)
+            else:
+                analyzed_articles.append(result)
         
         progress_bar.empty()
-        status_text.empty()
+        
+        with st.expander(f"✅ Classified articles ({len(analyzed_articles)})"):
+            st.markdown("\n".join(f"- {a['url']}: {a['classification']}" for a in analyzed_articles))
         
         st.success(f"Classification complete! Successfully analyzed {len(analyzed_articles)} articles")
         return analyzed_articles
     
-    def _classify_single_article(self, article: Dict[str, Any]) -> Dict[str, Any]:
+    async def _classify_articles_async(self, articles: List[Dict[str, Any]],
+                                       on_article_done: Callable[[Dict[str, Any]], None]) -> List[Any]:
         """
-        Classify and analyze a single article based on its summary and fact-check results
+        Classify articles concurrently in batches, bounded by GEMINI_CONCURRENCY in-flight requests
         
         Args:
-            article (Dict[str, Any]): Article with summary and fact-check results
+            articles (List[Dict[str, Any]]): Articles with summaries and fact-check results
+            on_article_done (Callable): Called after each article finishes, in completion order
             
         Returns:
-            Dict[str, Any]: Classification and analysis results
+            List[Any]: Classification results in input order, or the exception raised for an article
         """
-        # Create classification prompt
-        prompt = self._create_classification_prompt(article)
+        concurrency = int(os.getenv('GEMINI_CONCURRENCY', '8'))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        # Gemini calls run on worker threads; size the pool so every semaphore slot gets one
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        
+        async def classify_with_limit(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self._classify_batch_async(batch)
+                finally:
+                    for article in batch:
+                        on_article_done(article)
+        
+        # Serve previously classified articles from the cache
+        results: List[Any] = [None] * len(articles)
+        pending = []
+        for index, article in enumerate(articles):
+            cached_analysis = self._get_cached_analysis(article)
+            if cached_analysis is not None:
+                results[index] = self._build_result(article, cached_analysis)
+                on_article_done(article)
+            else:
+                pending.append(index)
+        
+        # Settle articles with a confident local zero-shot label without calling Gemini
+        if pending:
+            local_analyses = self._classify_locally([articles[index] for index in pending])
+            still_pending = []
+            for index, local_analysis in zip(pending, local_analyses):
+                if local_analysis is not None:
+                    results[index] = self._build_result(articles[index], local_analysis)
+                    on_article_done(articles[index])
+                else:
+                    still_pending.append(index)
+            pending = still_pending
+        
+        # Pack several articles into each request to amortize per-call overhead
+        iterator = iter(pending)
+        batches = []
+        while batch := list(islice(iterator, BATCH_SIZE)):
+            batches.append(batch)
+        
+        tasks = [classify_with_limit([articles[index] for index in batch]) for batch in batches]
+        batch_results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for batch, batch_result in zip(batches, batch_results):
+            for offset, index in enumerate(batch):
+                if isinstance(batch_result, Exception):
+                    results[index] = batch_result
+                else:
+                    results[index] = batch_result[offset]
+        return results
+    
+    def _classify_locally(self, articles: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Classify articles with the local zero-shot model, keeping only confident labels
+        
+        Args:
+            articles (List[Dict[str, Any]]): Articles with summaries
+            
+        Returns:
+            List[Optional[Dict[str, Any]]]: Analysis per article, or None where Gemini is still needed
+        """
+        analyses: List[Optional[Dict[str, Any]]] = [None] * len(articles)
+        classifier = _get_local_classifier(os.getenv('LOCAL_CLASSIFIER_MODEL', DEFAULT_LOCAL_CLASSIFIER_MODEL))
+        if classifier is None:
+            return analyses
+        
+        indexed_summaries = [(i, a['summary']) for i, a in enumerate(articles) if a.get('summary')]
+        if not indexed_summaries:
+            return analyses
+        
+        threshold = float(os.getenv('LOCAL_CLASSIFIER_THRESHOLD', '0.75'))
+        try:
+            predictions = classifier(
+                [self._trim(summary, MAX_SUMMARY_TOKENS) for _, summary in indexed_summaries],
+                candidate_labels=list(self.categories)
+            )
+        except Exception as e:
+            st.warning(f"Local classification failed, using Gemini for all articles: {str(e)}")
+            return analyses
+        
+        # The pipeline unwraps single-item inputs into a bare dict
+        if isinstance(predictions, dict):
+            predictions = [predictions]
+        
+        for (i, _), prediction in zip(indexed_summaries, predictions):
+            top_score = prediction['scores'][0]
+            if top_score > threshold:
+                analyses[i] = {
+                    'classification': prediction['labels'][0],
+                    'confidence': 'medium',
+                    'key_themes': [],
+                    'analysis_notes': f'Classified locally by zero-shot model (score {top_score:.2f})',
+                    'sentiment': 'neutral',
+                    'credibility_score': 0.5
+                }
+        return analyses
+    
+    async def _classify_batch_async(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Classify a batch of articles with a single Gemini request
+        
+        Falls back to classifying each article individually when a response
+        arrives but cannot be matched up with the batch.
+        
+        Args:
+            articles (List[Dict[str, Any]]): Batch of articles with summaries and fact-check results
+            
+        Returns:
+            List[Dict[str, Any]]: Classification and analysis results in input order
+        """
+        if len(articles) == 1:
+            return [await self._classify_single_article_async(articles[0])]
+        
+        prompt = self._create_batch_classification_prompt(articles)
+        response = await self._generate_with_retries_async(
+            prompt, f"batch of {len(articles)} articles", self.batch_generation_config
+        )
+        
+        # Retries are already exhausted, so per-article requests would only repeat the failure
+        if response is None:
+            return [self._create_fallback_result(article) for article in articles]
         
-        # Try up to 3 times to get a valid response
-        max_retries = 3
+        analyses = None
+        try:
+            # response.text raises ValueError when Gemini blocks the response or returns no parts
+            if response.text and response.text.strip():
+                analyses = self._parse_json(self._extract_json_from_response(response.text, opener='['))
+        except ValueError as e:
+            st.warning(f"Unusable batch response from Gemini: {str(e)}")
+        
+        if not isinstance(analyses, list) or len(analyses) != len(articles):
+            st.warning(f"Batch response did not match {len(articles)} articles, classifying individually...")
+            return await self._classify_individually_async(articles)
+        
+        results = []
+        for article, analysis in zip(articles, analyses):
+            if not isinstance(analysis, dict):
+                analysis = {}
+            # Only complete analyses are cached; default-filled ones are re-queried next run
+            is_complete = self._validate_analysis_fields(analysis)
+            if not is_complete:
+                st.warning(f"Missing required fields in analysis for {article['url']}")
+                analysis = self._fix_missing_analysis_fields(analysis)
+            self._validate_classification(analysis)
+            if is_complete:
+                self._cache_analysis(article, analysis)
+            results.append(self._build_result(article, analysis))
+        return results
+    
+    async def _classify_individually_async(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Classify articles one request at a time, isolating failures to the article that raised
+        
+        Args:
+            articles (List[Dict[str, Any]]): Articles with summaries and fact-check results
+            
+        Returns:
+            List[Dict[str, Any]]: Classification and analysis results in input order
+        """
+        results = []
+        for article in articles:
+            try:
+                results.append(await self._classify_single_article_async(article))
+            except Exception as e:
+                st.error(f"❌ Error classifying {article['url']}: {str(e)}")
+                results.append(self._create_fallback_result(article))
+        return results
+    
+    async def _generate_with_retries_async(self, prompt: str, label: str,
+                                           generation_config: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """
+        Send a prompt to Gemini, retrying with backoff on failures and rate limits
+        
+        Args:
+            prompt (str): Prompt to send
+            label (str): Description of the request used in status messages
+            generation_config (Optional[Dict[str, Any]]): Overrides for the model's generation config
+            
+        Returns:
+            Optional[Any]: Gemini response, or None if every attempt failed
+        """
+        # Rate limits and transient errors get up to 5 attempts, other errors up to 3,
+        # and errors that cannot succeed on retry fail immediately
+        max_retries = 5
         for attempt in range(max_retries):
+            await self.rate_limiter.acquire(est_tokens=len(prompt) // CHARS_PER_TOKEN)
             try:
                 # Get response from Gemini
-                st.info(f"Requesting classification from Gemini (attempt {attempt + 1}/{max_retries}) for: {article['url']}")
-                response = self.model.generate_content(prompt)
-                st.success(f"Successfully received response from Gemini for: {article['url']}")
-                break
+                return await asyncio.to_thread(
+                    self.model.generate_content, prompt, generation_config=generation_config
+                )
             except Exception as e:
-                if attempt == max_retries - 1:  # Last attempt
-                    st.error(f"Failed to get response from Gemini for {article['url']} after {max_retries} attempts: {str(e)}")
-                    return self._create_fallback_result(article)
+                if isinstance(e, NON_RETRYABLE_ERRORS):
+                    attempt_limit = 1
+                elif isinstance(e, TRANSIENT_ERRORS):
+                    attempt_limit = max_retries
                 else:
-                    st.warning(f"Attempt {attempt + 1} failed for {article['url']}, retrying...")
-                    time.sleep(2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
+                    attempt_limit = 3
+                if attempt + 1 >= attempt_limit:  # Last attempt
+                    st.error(f"Failed to get response from Gemini for {label} after {attempt + 1} attempts: {str(e)}")
+                    return None
+                if isinstance(e, google_exceptions.ResourceExhausted):
+                    st.warning(f"Rate limited by Gemini for {label}, backing off...")
+                    self.rate_limiter.shrink()
+                else:
+                    st.warning(f"Attempt {attempt + 1} failed for {label}, retrying...")
+                # Exponential backoff with jitter: ~1s, 2s, 4s, 8s
+                await asyncio.sleep(2 ** attempt + random.random())
+        return None
+    
+    async def _classify_single_article_async(self, article: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Classify and analyze a single article based on its summary and fact-check results
         
-        # Clean and parse JSON response
-        try:
-            # Check if response is empty
-            if not response.text or response.text.strip() == "":
-                st.warning(f"Empty response from Gemini for {article['url']}")
-                return self._create_fallback_result(article)
+        Args:
+            article (Dict[str, Any]): Article with summary and fact-check results
             
-            # Clean the response text to extract JSON
-            cleaned_response = self._extract_json_from_response(response.text)
+        Returns:
+            Dict[str, Any]: Classification and analysis results
+        """
+        # Create classification prompt
+        prompt = self._create_classification_prompt(article)
+        
+        response = await self._generate_with_retries_async(prompt, article['url'])
+        if response is None:
+            return self._create_fallback_result(article)
+        
+        # Clean and parse JSON response
+        # Check if response is empty
+        if not response.text or response.text.strip() == "":
+            st.warning(f"Empty response from Gemini for {article['url']}")
+            return self._create_fallback_result(article)
+        
+        # Clean the response text to extract JSON
+        cleaned_response = self._extract_json_from_response(response.text)
+        
+        # Check if cleaned response is empty
+        if not cleaned_response or cleaned_response.strip() == "":
+            st.warning(f"Could not extract JSON content from response for {article['url']}")
+            st.info(f"Raw response: {response.text[:200]}...")
+            return self._create_fallback_result(article)
+        
+        analysis = self._parse_json(cleaned_response)
+        if not isinstance(analysis, dict):
+            st.warning(f"Failed to parse JSON response for {article['url']}")
+            st.info(f"Raw response: {response.text[:200]}...")
+            st.info(f"Cleaned response: {cleaned_response[:200]}...")
+            return self._create_fallback_result(article)
+        
+        # Validate that required fields are present
+        is_complete = self._validate_analysis_fields(analysis)
+        if not is_complete:
+            st.warning(f"Missing required fields in analysis for {article['url']}")
+            analysis = self._fix_missing_analysis_fields(analysis)
+        
+        self._validate_classification(analysis)
+        # Only complete analyses are cached; default-filled ones are re-queried next run
+        if is_complete:
+            self._cache_analysis(article, analysis)
+        return self._build_result(article, analysis)
+    
+    def _classification_cache_key(self, article: Dict[str, Any]) -> str:
+        """
+        Build a cache key from everything that determines an article's classification
+        
+        Args:
+            article (Dict[str, Any]): Article with summary and fact-check results
             
-            # Check if cleaned response is empty
-            if not cleaned_response or cleaned_response.strip() == "":
-                st.warning(f"Could not extract JSON content from response for {article['url']}")
-                st.info(f"Raw response: {response.text[:200]}...")
-                return self._create_fallback_result(article)
+        Returns:
+            str: Hex digest identifying the classification inputs
+        """
+        fact_check_digest = json.dumps(article.get('fact_check_results', []), sort_keys=True, default=str)
+        key_material = "\x1f".join([
+            self.model.model_name,
+            str(PROMPT_VERSION),
+            article.get('summary', ''),
+            article.get('overall_status', 'Unsure'),
+            fact_check_digest
+        ])
+        return hashlib.blake2b(key_material.encode('utf-8')).hexdigest()
+    
+    def _get_cached_analysis(self, article: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previously stored Gemini analysis for an article
+        
+        Args:
+            article (Dict[str, Any]): Article with summary and fact-check results
             
-            # Validate JSON structure before parsing
-            if not self._validate_json_structure(cleaned_response):
-                st.warning(f"Invalid JSON structure in response for {article['url']}")
-                st.info(f"Cleaned response: {cleaned_response[:200]}...")
-                return self._create_fallback_result(article)
+        Returns:
+            Optional[Dict[str, Any]]: Cached analysis, or None on a cache miss
+        """
+        return self.classification_cache.get(self._classification_cache_key(article))
+    
+    def _cache_analysis(self, article: Dict[str, Any], analysis: Dict[str, Any]):
+        """
+        Store a successful Gemini analysis for an article
+        
+        Args:
+            article (Dict[str, Any]): Article with summary and fact-check results
+            analysis (Dict[str, Any]): Parsed classification from Gemini
+        """
+        self.classification_cache.set(self._classification_cache_key(article), analysis, expire=CACHE_EXPIRE_SECONDS)
+    
+    def _build_result(self, article: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine an article with its Gemini analysis into the final result
+        
+        Args:
+            article (Dict[str, Any]): Article with summary and fact-check results
+            analysis (Dict[str, Any]): Parsed classification from Gemini
             
-            analysis = json.loads(cleaned_response)
+        Returns:
+            Dict[str, Any]: Classification and analysis results
+        """
+        return {
+            'url': article['url'],
+            'title': article.get('title', 'Untitled'),
+            'content_hash': store_content(article.get('content', '')),
+            'summary': article.get('summary', ''),
+            'claims': article.get('claims', []),
+            'fact_check_results': article.get('fact_check_results', []),
+            'overall_fact_status': article.get('overall_status', 'Unsure'),
+            'classification': analysis.get('classification', 'Other'),
+            'confidence': analysis.get('confidence', 'medium'),
+            'key_themes': analysis.get('key_themes', []),
+            'analysis_notes': analysis.get('analysis_notes', ''),
+            'sentiment': analysis.get('sentiment', 'neutral'),
+            'credibility_score': analysis.get('credibility_score', 0.5)
+        }
+    
+    def _create_prompt_prefix(self, batch: bool = False) -> str:
+        """
+        Create the invariant instructions that start every classification prompt
+        
+        Args:
+            batch (bool): Whether the prefix introduces a batch of articles
             
-            # Validate that required fields are present
-            if not self._validate_analysis_fields(analysis):
-                st.warning(f"Missing required fields in analysis for {article['url']}")
-                analysis = self._fix_missing_analysis_fields(analysis)
+        Returns:
+            str: Prompt prefix ending with the article section marker
+        """
+        if batch:
+            task = (
+                "Analyze and classify each article listed at the end of this prompt based on its SUMMARY "
+                "and fact-check results.\n"
+                "DO NOT analyze the full content - focus only on the summaries provided.\n"
+                "Classify each article independently and return one analysis per article, "
+                "in the same order as the articles are listed.\n"
+            )
+            marker = "---ARTICLES---\n"
+        else:
+            task = (
+                "Analyze and classify the article at the end of this prompt based on its SUMMARY "
+                "and fact-check results.\n"
+                "DO NOT analyze the full content - focus only on the summary provided.\n"
+            )
+            marker = "---ARTICLE---\n"
+        
+        return f"{task}\nCategories: {self._categories_csv}\n\n{CLASSIFICATION_GUIDELINES}\n{marker}"
+    
+    def _format_article_for_prompt(self, article: Dict[str, Any]) -> str:
+        """
+        Format the article-specific fields used in classification prompts
+        
+        Args:
+            article (Dict[str, Any]): Article to classify
             
-            return {
-                'url': article['url'],
-                'title': article.get('title', 'Untitled'),
-                'content': article.get('content', ''),
-                'summary': article.get('summary', ''),
-                'claims': article.get('claims', []),
-                'fact_check_results': article.get('fact_check_results', []),
-                'overall_fact_status': article.get('overall_status', 'Unsure'),
-                'classification': analysis.get('classification', 'Other'),
-                'confidence': analysis.get('confidence', 'medium'),
-                'key_themes': analysis.get('key_themes', []),
-                'analysis_notes': analysis.get('analysis_notes', ''),
-                'sentiment': analysis.get('sentiment', 'neutral'),
-                'credibility_score': analysis.get('credibility_score', 0.5)
-            }
+        Returns:
+            str: Article URL, title, summary and fact-check information
+        """
+        # Prepare fact-check information, joined once rather than grown string by string
+        fact_check_info = ""
+        if article.get('fact_check_results'):
+            fact_check_info = FACT_CHECK_HEADER + "".join(
+                f"{i}. Claim: {self._trim(result['claim'], MAX_CLAIM_TOKENS)}\n"
+                f"   Status: {result['status']} (Rating: {result['rating']})\n"
+                + (f"   Publisher: {result['publisher']}\n" if result.get('publisher') else "")
+                for i, result in enumerate(article['fact_check_results'][:3], 1)  # Show top 3
+            )
+        
+        return (
+            f"URL: {article['url']}\n"
+            f"Title: {article.get('title', 'Untitled')}\n"
+            f"Summary: {self._trim(article.get('summary', ''), MAX_SUMMARY_TOKENS)}\n"
+            f"Overall Fact Status: {article.get('overall_status', 'Unsure')}\n"
+            f"{fact_check_info}"
+        )
+    
+    def _trim(self, text: str, max_tokens: int) -> str:
+        """
+        Truncate text to an approximate token budget
+        
+        Args:
+            text (str): Text to include in a prompt
+            max_tokens (int): Maximum number of tokens to keep
             
-        except json.JSONDecodeError as e:
-            st.warning(f"Failed to parse JSON response for {article['url']}: {str(e)}")
-            st.info(f"Raw response: {response.text[:200]}...")
-            st.info(f"Cleaned response: {cleaned_response[:200]}...")
-            return self._create_fallback_result(article)
+        Returns:
+            str: Text unchanged if within budget, otherwise cut with a trailing ellipsis
+        """
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars] + "..."
     
     def _create_classification_prompt(self, article: Dict[str, Any]) -> str:
         """
@@ -218,101 +776,96 @@ class AnalysisAgent:
         Returns:
             str: Formatted prompt
         """
-        # Prepare fact-check information
-        fact_check_info = ""
-        if article.get('fact_check_results'):
-            fact_check_info = "Fact-check Results:\n"
-            for i, result in enumerate(article['fact_check_results'][:3], 1):  # Show top 3
-                fact_check_info += f"{i}. Claim: {result['claim'][:100]}...\n"
-                fact_check_info += f"   Status: {result['status']} (Rating: {result['rating']})\n"
-                fact_check_info += f"   Publisher: {result['publisher']}\n\n"
-        
-        return f"""
-        Analyze and classify the following article based on its SUMMARY and fact-check results.
-        DO NOT analyze the full content - focus only on the summary provided.
-        
-        Article URL: {article['url']}
-        Title: {article.get('title', 'Untitled')}
-        Summary: {article.get('summary', '')}
-        Overall Fact Status: {article.get('overall_status', 'Unsure')}
-        
-        {fact_check_info}
-        
-        Please provide the following analysis in EXACT JSON format:
-        {{
-            "classification": "One of these categories: {', '.join(self.categories)}",
-            "confidence": "One of: high, medium, low",
-            "key_themes": ["List of main themes or topics discussed"],
-            "analysis_notes": "Brief analysis of content quality and reliability",
-            "sentiment": "One of: positive, negative, neutral, mixed",
-            "credibility_score": 0.5
-        }}
-        
-        Guidelines:
-        - Classify based on the main topic/theme of the SUMMARY only
-        - Consider the fact-check results when assessing credibility
-        - Provide confidence level based on clarity and verifiability of claims
-        - Identify key themes that appear in the summary
-        - Assess overall sentiment and tone from the summary
-        - Provide a credibility score between 0.0 (low) and 1.0 (high)
-        
-        CRITICAL: 
-        - Respond ONLY with valid JSON
-        - Do not include any markdown formatting, explanations, or additional text
-        - Ensure all field values are properly quoted and formatted
-        - Use double quotes for strings, not single quotes
-        - Ensure arrays and objects are properly closed
-        """
-    
-    def _extract_json_from_response(self, response_text: str) -> str:
+        return self._prompt_prefix + self._format_article_for_prompt(article)
+    
+    def _create_batch_classification_prompt(self, articles: List[Dict[str, Any]]) -> str:
+        """
+        Create a classification prompt covering several articles for Gemini
+        
+        Args:
+            articles (List[Dict[str, Any]]): Articles to classify
+            
+        Returns:
+            str: Formatted prompt asking for one analysis per article
+        """
+        articles_info = "\n".join(
+            f"Article {i}:\n{self._format_article_for_prompt(article)}"
+            for i, article in enumerate(articles, 1)
+        )
+        return f"{self._batch_prompt_prefix}Number of articles: {len(articles)}\n\n{articles_info}"
+    
+    def _extract_json_from_response(self, response_text: str, opener: str = '{') -> str:
         """
         Extract JSON content from Gemini response text
         
         Args:
             response_text (str): Raw response from Gemini
+            opener (str): Opening bracket of the expected JSON value, '{' for objects or '[' for arrays
             
         Returns:
             str: Cleaned JSON string
         """
-        # Remove markdown code blocks if present
-        if '```json' in response_text:
-            start = response_text.find('```json') + 7
-            end = response_text.find('```', start)
-            if end != -1:
-                return response_text[start:end].strip()
-        
-        # Remove markdown code blocks without language specifier
-        if '```' in response_text:
-            start = response_text.find('```') + 3
-            end = response_text.find('```', start)
-            if end != -1:
-                return response_text[start:end].strip()
-        
-        # Try to find JSON-like content between curly braces
-        start = response_text.find('{')
-        end = response_text.rfind('}')
-        if start != -1 and end != -1 and end > start:
-            return response_text[start:end+1].strip()
+        text = response_text
+        
+        # Remove markdown code blocks, with or without a language specifier
+        for fence in ('```json', '```'):
+            if fence in text:
+                start = text.find(fence) + len(fence)
+                end = text.find('```', start)
+                text = text[start:end] if end != -1 else text[start:]
+                break
         
-        # If no JSON structure found, return the original text
-        return response_text.strip()
+        # Slice from the first expected opening bracket to its matching closing bracket,
+        # dropping any prose Gemini added before or after the JSON
+        start = text.find(opener)
+        if start == -1:
+            # If no JSON structure found, return the original text
+            return text.strip()
+        
+        depth = 0
+        in_string = False
+        escaped = False
+        for index in range(start, len(text)):
+            char = text[index]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+                if depth == 0:
+                    return text[start:index + 1]
+        
+        # Unbalanced (e.g. truncated) JSON is left for the repair step to close
+        return text[start:].strip()
     
-    def _validate_json_structure(self, json_str: str) -> bool:
+    def _parse_json(self, json_str: str) -> Optional[Any]:
         """
-        Validate if a string contains valid JSON structure
+        Parse JSON from Gemini, repairing common syntax mistakes if strict parsing fails
         
         Args:
-            json_str (str): String to validate
+            json_str (str): Cleaned JSON string
             
         Returns:
-            bool: True if valid JSON structure, False otherwise
+            Optional[Any]: Parsed object or array, or None if the text could not be recovered
         """
         try:
-            # Try to parse as JSON
-            json.loads(json_str)
-            return True
-        except json.JSONDecodeError:
-            return False
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            pass
+        
+        # json_repair fixes trailing commas, unquoted keys, single quotes and unclosed brackets
+        repaired = json_repair.loads(json_str)
+        if isinstance(repaired, (dict, list)):
+            return repaired
+        return None
     
     def _validate_analysis_fields(self, analysis: Dict[str, Any]) -> bool:
         """
@@ -353,6 +906,17 @@ class AnalysisAgent:
         
         return analysis
     
+    def _validate_classification(self, analysis: Dict[str, Any]):
+        """
+        Replace a classification outside the predefined categories with 'Other'
+        
+        Args:
+            analysis (Dict[str, Any]): Analysis dictionary, updated in place
+        """
+        classification = analysis.get('classification')
+        if not isinstance(classification, str) or classification not in self._categories_set:
+            analysis['classification'] = 'Other'
+    
     def _create_fallback_result(self, article: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create a fallback result when classification fails
@@ -366,7 +930,7 @@ class AnalysisAgent:
         return {
             'url': article['url'],
             'title': article.get('title', 'Untitled'),
-            'content': article.get('content', ''),
+            'content_hash': store_content(article.get('content', '')),
             'summary': article.get('summary', ''),
             'claims': article.get('claims', []),
             'fact_check_results': article.get('fact_check_results', []),
@@ -392,38 +956,34 @@ class AnalysisAgent:
         if not articles:
             return {}
         
+        # Materialize the columns once and let pandas do the counting in C
+        df = pd.DataFrame(articles, columns=[
+            'classification', 'overall_fact_status', 'confidence',
+            'sentiment', 'credibility_score', 'analysis_notes'
+        ])
+        
+        def count_values(column: str, labels) -> Dict[str, int]:
+            return df[column].value_counts().reindex(labels, fill_value=0).to_dict()
+        
         # Count by classification
-        classification_counts = {}
-        for category in self.categories:
-            classification_counts[category] = sum(
-                1 for a in articles if a.get('classification') == category
-            )
+        classification_counts = count_values('classification', self.categories)
         
         # Count by fact status
-        fact_status_counts = {
-            'Fact': sum(1 for a in articles if a.get('overall_fact_status') == 'Fact'),
-            'Myth': sum(1 for a in articles if a.get('overall_fact_status') == 'Myth'),
-            'Unsure': sum(1 for a in articles if a.get('overall_fact_status') == 'Unsure')
-        }
+        fact_status_counts = count_values('overall_fact_status', ['Fact', 'Myth', 'Unsure'])
         
         # Count by confidence
-        confidence_counts = {
-            'high': sum(1 for a in articles if a.get('confidence') == 'high'),
-            'medium': sum(1 for a in articles if a.get('confidence') == 'medium'),
-            'low': sum(1 for a in articles if a.get('confidence') == 'low')
-        }
+        confidence_counts = count_values('confidence', ['high', 'medium', 'low'])
         
         # Count by sentiment
-        sentiment_counts = {
-            'positive': sum(1 for a in articles if a.get('sentiment') == 'positive'),
-            'negative': sum(1 for a in articles if a.get('sentiment') == 'negative'),
-            'neutral': sum(1 for a in articles if a.get('sentiment') == 'neutral'),
-            'mixed': sum(1 for a in articles if a.get('sentiment') == 'mixed')
-        }
+        sentiment_counts = count_values('sentiment', ['positive', 'negative', 'neutral', 'mixed'])
         
         # Calculate average credibility score
-        credibility_scores = [a.get('credibility_score', 0.5) for a in articles]
-        avg_credibility = sum(credibility_scores) / len(credibility_scores) if credibility_scores else 0.5
+        avg_credibility = float(df['credibility_score'].fillna(0.5).mean())
+        
+        successful_analyses = int((
+            (df['classification'] != 'Other')
+            | (df['analysis_notes'] != 'Classification failed due to processing error')
+        ).sum())
         
         return {
             'total_articles': len(articles),
@@ -432,5 +992,5 @@ class AnalysisAgent:
             'confidence_counts': confidence_counts,
             'sentiment_counts': sentiment_counts,
             'average_credibility_score': round(avg_credibility, 3),
-            'successful_analyses': sum(1 for a in articles if a.get('classification') != 'Other' or a.get('analysis_notes') != 'Classification failed due to processing error')
+            'successful_analyses': successful_analyses
         } 
@@ -0,0 +1,60 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+# Raw article content is written here once instead of being carried in every analysis result
+CONTENT_DIR = os.path.join(os.getcwd(), 'temp', 'content')
+
+
+def store_content(content: str) -> str:
+    """
+    Write raw article content to the content folder, keyed by its hash
+    
+    Args:
+        content (str): Scraped article content
+        
+    Returns:
+        str: SHA-256 hex digest of the content, also the file name under temp/content
+    """
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    content_path = os.path.join(CONTENT_DIR, f"{content_hash}.txt")
+    if content and not os.path.exists(content_path):
+        os.makedirs(CONTENT_DIR, exist_ok=True)
+        with open(content_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return content_hash
+
+
+def load_content(content_hash: Optional[str], max_chars: Optional[int] = None) -> str:
+    """
+    Read article content previously written by store_content
+    
+    Args:
+        content_hash (Optional[str]): Hash returned by store_content
+        max_chars (Optional[int]): Read at most this many characters
+        
+    Returns:
+        str: Stored content, or an empty string if it is not available
+    """
+    if not content_hash:
+        return ""
+    try:
+        with open(os.path.join(CONTENT_DIR, f"{content_hash}.txt"), 'r', encoding='utf-8') as f:
+            return f.read(max_chars) if max_chars is not None else f.read()
+    except OSError:
+        return ""
+
+
+def with_content(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of an analysis result with its raw content restored from the content folder
+    
+    Args:
+        item (Dict[str, Any]): Analysis result carrying a content_hash
+        
+    Returns:
+        Dict[str, Any]: Result including a 'content' field
+    """
+    if 'content' in item:
+        return item
+    return {**item, 'content': load_content(item.get('content_hash'))}
@@ -5,6 +5,26 @@ import streamlit as st
 import json
 import time
 import re
+import threading
+
+
+@st.cache_resource
+def _get_session_store() -> threading.local:
+    """Process-wide holder for per-thread HTTP sessions"""
+    return threading.local()
+
+
+def _get_http_session() -> requests.Session:
+    """
+    Return this thread's keep-alive session so Fact Check API calls reuse TLS connections
+    
+    Streamlit runs each session in its own thread and requests.Session is not
+    documented as thread-safe, so sessions are kept per thread rather than shared.
+    """
+    store = _get_session_store()
+    if not hasattr(store, 'session'):
+        store.session = requests.Session()
+    return store.session
 
 
 class FactCheckAgent:
@@ -155,7 +175,7 @@ class FactCheckAgent:
                 'languageCode': 'en'
             }
             
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = _get_http_session().get(self.base_url, params=params, timeout=10)
             response.raise_for_status()
             
             data = response.json()
@@ -0,0 +1,27 @@
+import google.generativeai as genai
+import streamlit as st
+from typing import Any, Dict, Optional
+
+
+@st.cache_resource
+def get_gemini_model(api_key: str, model_name: str,
+                     generation_config: Optional[Dict[str, Any]] = None) -> genai.GenerativeModel:
+    """
+    Create a Gemini model once per process so its gRPC channel survives Streamlit reruns
+    
+    The model keeps the client it picks up on first use, so later calls to
+    genai.configure elsewhere do not drop its connection. Only use this for
+    synchronous calls (async code can run them via asyncio.to_thread):
+    asyncio channels are bound to the event loop that created them and
+    cannot be shared across asyncio.run calls.
+    
+    Args:
+        api_key (str): Google API key
+        model_name (str): Gemini model name
+        generation_config (Optional[Dict[str, Any]]): Default generation config for the model
+        
+    Returns:
+        genai.GenerativeModel: Shared model instance
+    """
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name, generation_config=generation_config)
@@ -3,6 +3,7 @@ import time
 from typing import Dict, Any, Optional
 from notion_client import Client
 from notion_client.errors import APIResponseError
+from .content_store import load_content
 
 # Try to import streamlit, but don't fail if not available
 try:
@@ -206,7 +207,9 @@ class NotionPublisher:
                     "url": str(item.get('url', '')) if item.get('url') else ""
                 },
                 "Content": {
-                    "rich_text": [{"text": {"content": safe_text_content(item.get('content', ''), 2000)}}]
+                    "rich_text": [{"text": {"content": safe_text_content(
+                        item.get('content') or load_content(item.get('content_hash'), 2000), 2000
+                    )}}]
                 },
                 "Summary": {
                     "rich_text": [{"text": {"content": safe_text_content(item.get('summary', ''), 2000)}}]
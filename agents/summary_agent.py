@@ -1,9 +1,9 @@
-import google.generativeai as genai
 import os
 from typing import List, Dict, Any
 import streamlit as st
 import json
 import time
+from .gemini_client import get_gemini_model
 
 
 class SummaryAgent:
@@ -12,8 +12,7 @@ class SummaryAgent:
     def __init__(self):
         self.api_key = os.getenv('GOOGLE_API_KEY')
         if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+            self.model = get_gemini_model(self.api_key, 'gemini-2.0-flash-lite')
         else:
             self.model = None
         
@@ -6,6 +6,7 @@ import json
 from database.db_manager import DatabaseManager
 from crewai_workflow import CrewAIWorkflow
 from agents.notion_publisher import NotionPublisher
+from agents.content_store import with_content
 
 class StreamlitUI:
     """Clean, production-ready UI for GMO FactLens"""
@@ -432,7 +433,7 @@ class StreamlitUI:
         with col1:
             # JSON export
             if st.button("📄 Export as JSON", use_container_width=True):
-                results_json = json.dumps(st.session_state.results, indent=2)
+                results_json = json.dumps([with_content(r) for r in st.session_state.results], indent=2)
                 st.download_button(
                     label="Download JSON File",
                     data=results_json,
@@ -446,7 +447,7 @@ class StreamlitUI:
             if st.button("📊 Export as CSV", use_container_width=True):
                 try:
                     import pandas as pd
-                    df = pd.DataFrame(st.session_state.results)
+                    df = pd.DataFrame([with_content(r) for r in st.session_state.results])
                     csv_data = df.to_csv(index=False)
                     st.download_button(
                         label="Download CSV File",